@@ -4,7 +4,7 @@ use glob::glob;
 use serde::Serialize;
 use std::collections::{BTreeMap, BTreeSet};
 use std::fs;
-use std::io::{self, Read};
+use std::io::{self, BufRead, Read, Write};
 use std::path::{Path, PathBuf};
 use tracing::{error, info};
 
@@ -181,6 +181,43 @@ pub enum CqlCommands {
         source_map_output: Option<PathBuf>,
     },
 
+    /// Compile many CQL files in one process, streaming ELM JSON to stdout.
+    ///
+    /// Reads one CQL file path per line. For each path, writes a header line
+    /// `OK <n>` or `ERR <n>` followed by <n> bytes of ELM JSON or error text,
+    /// flushing after every record so callers can drive it interactively.
+    CompileMany {
+        /// File listing CQL paths one per line, or "-" to read them from stdin
+        #[clap(long, value_name = "FILE", default_value = "-")]
+        paths_from: String,
+
+        /// Output compact JSON (no pretty-printing)
+        #[clap(long)]
+        compact: bool,
+
+        /// Enable debug mode (annotations, locators, result types)
+        #[clap(long)]
+        debug: bool,
+
+        /// Include result type metadata in output
+        #[clap(long)]
+        result_types: bool,
+
+        /// Enable strict mode (disable implicit conversions)
+        #[clap(long)]
+        strict: bool,
+
+        /// Include all signatures in output
+        #[clap(long)]
+        signatures: bool,
+
+        /// Additional directory to search for included CQL libraries.
+        /// May be specified multiple times. Each input file's directory is
+        /// always searched automatically.
+        #[clap(long, value_name = "DIR", num_args = 1)]
+        lib_path: Vec<PathBuf>,
+    },
+
     /// Validate CQL source without generating ELM
     Validate {
         /// Path(s) to CQL file(s) or glob pattern(s), or "-" to read from stdin
@@ -416,6 +453,28 @@ pub async fn handle_command(cmd: CqlCommands, ctx: &OutputContext) -> Result<()>
                 ctx,
             )?;
         }
+        CqlCommands::CompileMany {
+            paths_from,
+            compact,
+            debug,
+            strict,
+            result_types,
+            signatures,
+            lib_path,
+        } => {
+            // The framed record stream is the output contract here, so there
+            // is no envelope form to fall back to
+            if ctx.is_json() {
+                let error = EnvelopeError::new(
+                    "unsupported_format",
+                    "cql compile-many writes framed ELM records and does not support --format json or ndjson",
+                );
+                print_envelope(ctx, &error_envelope(vec![error], "cql compile-many"))?;
+                ExitCode::OperationalError.exit();
+            }
+            let options = build_compiler_options(debug, strict, result_types, signatures);
+            compile_many(&paths_from, &lib_path, &options, compact)?;
+        }
         CqlCommands::Validate {
             inputs,
             lib_path,
@@ -938,6 +997,70 @@ fn compile_cql(req: &CompileRequest, ctx: &OutputContext) -> Result<()> {
     Ok(())
 }
 
+/// Compile every CQL path listed in `paths_from`, writing one length-prefixed
+/// record per file to stdout.
+///
+/// A file that fails to compile produces an `ERR` record rather than ending
+/// the run, so one long-lived process can serve a whole batch of inputs.
+fn compile_many(
+    paths_from: &str,
+    lib_paths: &[PathBuf],
+    options: &CompilerOptions,
+    compact: bool,
+) -> Result<()> {
+    let paths: Box<dyn BufRead> = if paths_from == "-" {
+        Box::new(io::stdin().lock())
+    } else {
+        let file = fs::File::open(paths_from)
+            .with_context(|| format!("Failed to open path list: {paths_from}"))?;
+        Box::new(io::BufReader::new(file))
+    };
+    let mut stdout = io::stdout().lock();
+
+    for line in paths.lines() {
+        let line = line.context("Failed to read CQL path")?;
+        let input = line.trim();
+        if input.is_empty() {
+            continue;
+        }
+        let (status, payload) = match compile_to_elm_json(input, lib_paths, options, compact) {
+            Ok(json) => ("OK", json),
+            Err(e) => ("ERR", format!("{e:#}")),
+        };
+        writeln!(stdout, "{status} {}", payload.len())?;
+        stdout.write_all(payload.as_bytes())?;
+        stdout.flush()?;
+    }
+    Ok(())
+}
+
+/// Compile one CQL file to ELM JSON, folding compile diagnostics into the error.
+fn compile_to_elm_json(
+    input: &str,
+    lib_paths: &[PathBuf],
+    options: &CompilerOptions,
+    compact: bool,
+) -> Result<String> {
+    if input == "-" {
+        bail!("\"-\" is not a valid path in a compile-many path list");
+    }
+    let source = read_source(input)?;
+    let result = compile_with_search_dirs(&source, input, lib_paths, Some(options.clone()))?.result;
+    if !result.is_success() {
+        let messages: Vec<String> = result
+            .errors
+            .iter()
+            .map(|diagnostic| format!("  ✗ {}", format_diagnostic_message(diagnostic, true)))
+            .collect();
+        bail!(
+            "Compilation failed with {} error(s):\n{}",
+            result.errors.len(),
+            messages.join("\n")
+        );
+    }
+    serialize_elm(&result, compact)
+}
+
 // ---------------------------------------------------------------------------
 // Explain service
 // ---------------------------------------------------------------------------
@@ -720,6 +720,61 @@ fn test_compile_valid_cql_json_success_envelope() {
     assert_eq!(envelope["meta"]["command"], "cql compile");
 }
 
+// ---------------------------------------------------------------------------
+// compile-many
+// ---------------------------------------------------------------------------
+
+#[test]
+fn test_compile_many_streams_length_prefixed_records() {
+    let dir = TempDir::new().unwrap();
+    let valid_path = dir.path().join("simple.cql");
+    let invalid_path = dir.path().join("invalid.cql");
+    fs::write(&valid_path, SIMPLE_CQL).unwrap();
+    fs::write(&invalid_path, INVALID_CQL).unwrap();
+    let paths = format!("{}\n{}\n", valid_path.display(), invalid_path.display());
+
+    let assert = rh_cmd()
+        .args(["cql", "compile-many", "--paths-from", "-", "--compact"])
+        .write_stdin(paths)
+        .assert()
+        .success();
+    let mut stdout = assert.get_output().stdout.as_slice();
+
+    let mut records = Vec::new();
+    while !stdout.is_empty() {
+        let header_end = stdout.iter().position(|&b| b == b'\n').unwrap();
+        let header = std::str::from_utf8(&stdout[..header_end]).unwrap();
+        let (status, length) = header.split_once(' ').unwrap();
+        let length: usize = length.parse().unwrap();
+        let body = &stdout[header_end + 1..header_end + 1 + length];
+        records.push((status.to_string(), body.to_vec()));
+        stdout = &stdout[header_end + 1 + length..];
+    }
+
+    assert_eq!(records.len(), 2);
+    assert_eq!(records[0].0, "OK");
+    let elm: serde_json::Value = serde_json::from_slice(&records[0].1).unwrap();
+    assert_eq!(elm["library"]["identifier"]["id"], "SimpleMath");
+    assert_eq!(records[1].0, "ERR");
+    assert!(!records[1].1.is_empty());
+}
+
+#[test]
+fn test_compile_many_rejects_json_format_with_envelope() {
+    let assert = rh_cmd()
+        .args(["--format", "json", "cql", "compile-many"])
+        .write_stdin("")
+        .assert()
+        .code(1)
+        .stderr(predicate::str::is_empty());
+    let envelope: serde_json::Value =
+        serde_json::from_slice(&assert.get_output().stdout).expect("stdout must be one JSON value");
+
+    assert_eq!(envelope["ok"], false);
+    assert_eq!(envelope["errors"][0]["code"], "unsupported_format");
+    assert_eq!(envelope["meta"]["command"], "cql compile-many");
+}
+
 // ---------------------------------------------------------------------------
 // info – exit code behavior (task 2.4)
 // ---------------------------------------------------------------------------
@@ -0,0 +1,51 @@
+import java.io.BufferedReader;
+import java.io.ByteArrayOutputStream;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.nio.charset.StandardCharsets;
+
+/**
+ * Keeps one JVM running for compare_translators.py.
+ *
+ * <p>Launched with the CQL-to-ELM CLI's classpath and the name of its main
+ * class. Each stdin line is a tab-separated CLI argument list; the main method
+ * runs in-process with stdout and stderr captured, and the reply is a status
+ * line ("OK n" or "ERR n") followed by n bytes of captured output.
+ */
+public class TranslatorServer {
+    public static void main(String[] args) throws Exception {
+        Method cliMain = Class.forName(args[0]).getMethod("main", String[].class);
+        PrintStream protocol = System.out;
+        PrintStream stderr = System.err;
+        BufferedReader requests =
+                new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+
+        String line;
+        while ((line = requests.readLine()) != null) {
+            ByteArrayOutputStream captured = new ByteArrayOutputStream();
+            PrintStream capture = new PrintStream(captured, true, StandardCharsets.UTF_8);
+            System.setOut(capture);
+            System.setErr(capture);
+            String status = "OK";
+            try {
+                cliMain.invoke(null, (Object) line.split("\t", -1));
+            } catch (InvocationTargetException e) {
+                status = "ERR";
+                e.getCause().printStackTrace(capture);
+            } catch (Throwable e) {
+                status = "ERR";
+                e.printStackTrace(capture);
+            } finally {
+                System.setOut(protocol);
+                System.setErr(stderr);
+            }
+
+            byte[] output = captured.toByteArray();
+            protocol.print(status + " " + output.length + "\n");
+            protocol.write(output);
+            protocol.flush();
+        }
+    }
+}
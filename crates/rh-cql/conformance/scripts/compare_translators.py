@@ -7,32 +7,101 @@ Compare CQL-to-ELM translation output between:
 Usage:
     python compare_translators.py [--test-case NAME] [--options OPTIONS]
     python compare_translators.py --cooking [SESSION_NUMBERS]
+
+Batch modes (--all, --cooking, --operator-tests) translate files concurrently;
+use --jobs to control the number of worker threads.
 """
 
 import argparse
+import functools
+import hashlib
+import io
 import json
 import os
+import queue
+import re
+import shutil
 import subprocess
 import sys
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Optional
 
+try:
+    import orjson
+except ImportError:  # Optional speedup; fall back to the stdlib parser
+    orjson = None
+
 # Paths
 SCRIPT_DIR = Path(__file__).parent
 CONFORMANCE_DIR = SCRIPT_DIR.parent
 TOOLS_DIR = CONFORMANCE_DIR / "tools"
 TEST_CASES_DIR = CONFORMANCE_DIR / "test-cases"
 RESULTS_DIR = CONFORMANCE_DIR / "results"
+CACHE_DIR = RESULTS_DIR / ".translator-cache"
 COOKING_DIR = TOOLS_DIR / "cooking-with-cql/Source/Cooking With CQL"
 CQL_TO_ELM_TESTS_DIR = TOOLS_DIR / "cql-java/Src/java/cql-to-elm/src/jvmTest/resources/org/cqframework/cql/cql2elm"
 
 # Java CLI path
 JAVA_CLI = TOOLS_DIR / "cql-java/Src/java/cql-to-elm-cli/build/install/cql-to-elm-cli/bin/cql-to-elm-cli"
 
+# In-process driver for the Java CLI, run as a single-file source program
+JAVA_SERVER = SCRIPT_DIR / "TranslatorServer.java"
+
 # Rust CLI (relative to workspace root)
 WORKSPACE_ROOT = CONFORMANCE_DIR.parent.parent.parent
 RUST_CLI = WORKSPACE_ROOT / "target/release/rh"
 
+# FHIR package cache the Rust CLI always searches for included libraries
+FHIR_PACKAGES_DIR = Path.home() / ".fhir/packages"
+
+# Leave headroom for the JVM and Rust child processes each worker spawns
+DEFAULT_JOBS = max(1, (os.cpu_count() or 1) - 2)
+
+# Read and write JSON with orjson when available (disabled by --pure-python)
+USE_ORJSON = orjson is not None
+
+# Reuse cached translator outputs (disabled by --no-cache)
+USE_CACHE = True
+
+# Route Java translations through a persistent JVM (disabled by
+# --no-java-daemon)
+USE_JAVA_DAEMON = True
+
+# Stop comparing a file after this many differences (set by --max-diffs;
+# 0 means no limit)
+MAX_DIFFERENCES = 500
+
+# ELM fields that legitimately vary between implementations
+IGNORED_KEYS = frozenset({'translatorVersion', 'translatorOptions', 'signatureLevel'})
+
+# Model declarations matched by --model when filtering Cooking with CQL files
+MODEL_PATTERNS = {
+    'fhir': re.compile(rb'\busing\s+FHIR\b'),
+    'qdm': re.compile(rb'\busing\s+QDM\b'),
+}
+USING_PATTERN = re.compile(rb'^\s*using\s', re.M)
+
+# Library includes; the translators look up the last segment of a qualified
+# name, optionally quoted, as `<name>.cql` or `<name>-<version>.cql`
+INCLUDE_PATTERN = re.compile(rb'^\s*include\s+(?:[\w"`]+\.)*(?:"([^"]+)"|`([^`]+)`|(\w+))', re.M)
+
+# Sentinel for dict lookups where None is a legitimate value
+_MISSING = object()
+
+# Serializes console output from concurrent test cases
+_OUTPUT_LOCK = threading.Lock()
+
+
+def emit(text: str, file=None):
+    """Print a block of text without interleaving it with other workers."""
+    with _OUTPUT_LOCK:
+        print(text, file=file or sys.stdout, flush=True)
+
 
 def git_commit(repo_dir: Path) -> Optional[str]:
     """Return the checked-out git commit for a local repository."""
@@ -48,8 +117,13 @@ def git_commit(repo_dir: Path) -> Optional[str]:
     return result.stdout.strip()
 
 
+@functools.lru_cache(maxsize=None)
 def reference_metadata() -> dict:
-    """Collect reference implementation metadata for reproducible reports."""
+    """Collect reference implementation metadata for reproducible reports.
+    
+    Computed once per run and shared by every comparison; callers must not
+    mutate the result.
+    """
     return {
         "java_translator": {
             "repository": "https://github.com/cqframework/clinical_quality_language.git",
@@ -59,129 +133,540 @@ def reference_metadata() -> dict:
     }
 
 
-def normalize_elm(elm: dict) -> dict:
-    """Normalize ELM JSON for comparison by removing variable fields."""
-    def recurse(obj: Any) -> Any:
-        if isinstance(obj, dict):
-            result = {}
-            for k, v in obj.items():
-                # Skip fields that vary between implementations
-                if k in ('translatorVersion', 'translatorOptions', 'signatureLevel'):
-                    continue
-                # Keep localId but note it may differ
-                result[k] = recurse(v)
-            return result
-        elif isinstance(obj, list):
-            return [recurse(item) for item in obj]
+def list_cql_files(directory: Path) -> list[Path]:
+    """List the .cql files in a directory, sorted by name.
+    
+    A single os.scandir pass reuses the directory entries' cached type
+    information instead of building and stat-ing a Path per entry.
+    """
+    with os.scandir(directory) as entries:
+        return sorted(
+            (Path(entry.path) for entry in entries if entry.name.endswith(".cql") and entry.is_file()),
+            key=lambda cql_file: cql_file.name,
+        )
+
+
+def list_subdirectories(directory: Path) -> list[Path]:
+    """List the subdirectories of a directory, sorted by name."""
+    with os.scandir(directory) as entries:
+        return sorted((Path(entry.path) for entry in entries if entry.is_dir()), key=lambda d: d.name)
+
+
+def include_closure(cql_files: list[Path]) -> list[Path]:
+    """Return `cql_files` followed by every library they include, transitively.
+    
+    Includes are resolved the way the translators resolve them, against the
+    including file's directory; a library that cannot be found there is left
+    for the translator to report.
+    """
+    closure = dict.fromkeys(cql_files)
+    listings = {}
+    pending = list(cql_files)
+    while pending:
+        cql_file = pending.pop()
+        source_dir = cql_file.parent
+        if source_dir not in listings:
+            listings[source_dir] = list_cql_files(source_dir)
+        for match in INCLUDE_PATTERN.finditer(cql_file.read_bytes()):
+            name = next(group for group in match.groups() if group).decode()
+            for library in listings[source_dir]:
+                if library not in closure and (library.stem == name or library.stem.startswith(f"{name}-")):
+                    closure[library] = None
+                    pending.append(library)
+    return list(closure)
+
+
+@functools.lru_cache(maxsize=None)
+def build_fingerprint(root: Path) -> str:
+    """Identify a translator build by the names, sizes and mtimes of its files."""
+    if not root.exists():
+        return "missing"
+    files = sorted(p for p in root.rglob("*") if p.is_file()) if root.is_dir() else [root]
+    h = hashlib.sha256()
+    for path in files:
+        stat = path.stat()
+        h.update(f"{path.relative_to(root.parent)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def source_dir_digest(source_dir: Path) -> str:
+    """Hash every CQL file in a directory.
+    
+    Both translators resolve includes against the input file's directory, so
+    a change to any sibling library can change a file's ELM.
+    """
+    if not source_dir.is_dir():
+        return "missing"
+    h = hashlib.sha256()
+    for cql_file in list_cql_files(source_dir):
+        h.update(cql_file.name.encode() + b"\0")
+        h.update(hashlib.sha256(cql_file.read_bytes()).digest())
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def packages_fingerprint(packages_dir: Path) -> str:
+    """Identify the CQL libraries in a FHIR package cache by the names, sizes
+    and mtimes of its `Library-*.json` resources."""
+    if not packages_dir.is_dir():
+        return "missing"
+    libraries = sorted([*packages_dir.glob("*/package/Library-*.json"), *packages_dir.glob("*/Library-*.json")])
+    h = hashlib.sha256()
+    for path in libraries:
+        stat = path.stat()
+        h.update(f"{path.relative_to(packages_dir)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+
+def lib_paths(options: list[str] = None) -> list[Path]:
+    """Return the `--lib-path` directories named in translator options."""
+    options = options or []
+    paths = []
+    for i, option in enumerate(options):
+        if option == "--lib-path" and i + 1 < len(options):
+            paths.append(Path(options[i + 1]))
+        elif option.startswith("--lib-path="):
+            paths.append(Path(option.partition("=")[2]))
+    return paths
+
+
+def cache_key(build: Path, cql_file: Path, options: list[str] = None, packages_dir: Path = None) -> str:
+    """Key a translation by translator build, options, and every CQL source
+    its includes can resolve to: the file's directory, `--lib-path`
+    directories and, when given, a FHIR package cache."""
+    h = hashlib.sha256()
+    h.update(build_fingerprint(build).encode())
+    h.update(cql_file.name.encode() + b"\0")
+    h.update(source_dir_digest(cql_file.parent.resolve()).encode())
+    h.update(repr(options or []).encode())
+    for lib_path in lib_paths(options):
+        h.update(source_dir_digest(lib_path.resolve()).encode())
+    if packages_dir is not None:
+        h.update(packages_fingerprint(packages_dir).encode())
+    return h.hexdigest()
+
+
+def cache_fetch(kind: str, key: str, output_file: Path) -> bool:
+    """Copy a cached translation to `output_file`, returning whether it was found."""
+    cached = CACHE_DIR / kind / f"{key}.json"
+    if not USE_CACHE or not cached.exists():
+        return False
+    shutil.copyfile(cached, output_file)
+    return True
+
+
+def cache_store(kind: str, key: str, output_file: Path):
+    """Save a fresh translation to the cache."""
+    cached = CACHE_DIR / kind / f"{key}.json"
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    # Copy then rename so concurrent readers never see a partial file
+    partial = cached.with_suffix(f".{threading.get_ident()}.tmp")
+    shutil.copyfile(output_file, partial)
+    partial.replace(cached)
+
+
+def java_cache_key(cql_file: Path, options: list[str] = None) -> str:
+    # The install directory holds the launcher script and every jar it loads
+    return cache_key(JAVA_CLI.parent.parent, cql_file, options)
+
+
+def rust_cache_key(cql_file: Path, options: list[str] = None) -> str:
+    return cache_key(RUST_CLI, cql_file, options, FHIR_PACKAGES_DIR)
+
+
+def load_json(path: Path) -> Any:
+    """Parse a JSON file, using orjson when it is installed and enabled."""
+    data = path.read_bytes()
+    if USE_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode_json(data: Any) -> bytes:
+    """Encode compact JSON, using orjson when enabled.
+    
+    JSON results are for tooling; summary.txt is the human-readable view, and
+    `python -m json.tool` pretty-prints a file when needed.
+    """
+    if USE_ORJSON:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+def canonical_json(data: Any) -> bytes:
+    """Encode JSON with sorted keys, so equal trees encode identically
+    regardless of the order their keys were emitted in."""
+    if USE_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(data, separators=(',', ':'), sort_keys=True).encode()
+
+
+def dump_json(data: Any, path: Path):
+    """Write compact JSON to a file."""
+    path.write_bytes(encode_json(data))
+
+
+class ResultsWriter:
+    """Collects per-test result files in memory and writes them in batches.
+    
+    Batch runs produce a comparison.json and summary.txt per test case;
+    deferring them to one flush per batch keeps filesystem metadata work out
+    of the worker threads. With `archive` set, the files go into a single tar
+    file instead, which the first flush of a run replaces and later flushes
+    append to. Paths are relative to RESULTS_DIR.
+    """
+    
+    def __init__(self, archive: Optional[Path] = None, text_summaries: bool = True):
+        self.archive = archive
+        self.text_summaries = text_summaries
+        self.files: dict[str, bytes] = {}
+        self.archive_started = False
+    
+    def add(self, relative_path: str, data: bytes):
+        self.files[relative_path] = data
+    
+    def flush(self):
+        if self.archive:
+            self.archive.parent.mkdir(parents=True, exist_ok=True)
+            with tarfile.open(self.archive, 'a' if self.archive_started else 'w') as tar:
+                for name, data in sorted(self.files.items()):
+                    info = tarfile.TarInfo(name)
+                    info.size = len(data)
+                    info.mtime = int(time.time())
+                    tar.addfile(info, io.BytesIO(data))
+            self.archive_started = True
         else:
-            return obj
-    return recurse(elm)
+            for name, data in self.files.items():
+                (RESULTS_DIR / name).write_bytes(data)
+        self.files.clear()
+
+
+class DiffLimitReached(Exception):
+    """Raised when a DifferenceList reaches its limit."""
+
+
+class DifferenceList(list):
+    """Differences list that aborts the comparison once `limit` entries exist.
+    
+    A badly regressed file can differ at tens of thousands of nodes, but only
+    a sample is ever shown, so there is no point walking the rest of the tree.
+    """
+    
+    def __init__(self, limit: int = 0):
+        super().__init__()
+        self.limit = limit
+    
+    def append(self, difference: dict):
+        # Raise on the first difference past the limit, so a comparison is
+        # only marked truncated when something was actually left out
+        if self.limit and len(self) >= self.limit:
+            raise DiffLimitReached
+        super().append(difference)
+
+
+def format_path(path: tuple) -> str:
+    """Render a linked (parent, part) path as e.g. 'library.statements.def[0]'."""
+    parts = []
+    while path[0] is not None:
+        path, part = path
+        parts.append(f"[{part}]" if isinstance(part, int) else f".{part}")
+    parts.append(path[1])
+    return ''.join(reversed(parts))
 
 
 def compare_values(path: str, java_val: Any, rust_val: Any, differences: list):
-    """Recursively compare values and collect differences."""
-    if type(java_val) != type(rust_val):
-        differences.append({
-            'path': path,
-            'type': 'type_mismatch',
-            'java': f"{type(java_val).__name__}: {java_val}",
-            'rust': f"{type(rust_val).__name__}: {rust_val}"
-        })
-        return
-    
-    if isinstance(java_val, dict):
-        java_keys = set(java_val.keys())
-        rust_keys = set(rust_val.keys())
+    """Compare two ELM trees and collect differences.
+    
+    Keys in IGNORED_KEYS are skipped at every level of the tree. The walk uses
+    an explicit stack rather than recursion, so deeply nested ELM cannot hit
+    the interpreter's recursion limit. Children are pushed in reverse so
+    differences are reported in depth-first order.
+    
+    Below the root name `path`, paths are tracked as linked (parent, part)
+    pairs, so descending costs O(1) regardless of depth; they are only
+    formatted as strings for reported differences.
+    """
+    stack = [((None, path), java_val, rust_val)]
+    while stack:
+        path, java_val, rust_val = stack.pop()
         
-        # Missing in rust
-        for key in java_keys - rust_keys:
-            # Skip empty arrays
-            if isinstance(java_val[key], list) and len(java_val[key]) == 0:
-                continue
-            differences.append({
-                'path': f"{path}.{key}",
-                'type': 'missing_in_rust',
-                'java': java_val[key]
-            })
+        if java_val is rust_val:
+            continue
         
-        # Extra in rust
-        for key in rust_keys - java_keys:
-            # Skip empty arrays
-            if isinstance(rust_val[key], list) and len(rust_val[key]) == 0:
-                continue
+        # Exact type identity: JSON parsers never produce subclasses, and this
+        # keeps bool and int distinct
+        java_type = type(java_val)
+        if java_type is not type(rust_val):
             differences.append({
-                'path': f"{path}.{key}",
-                'type': 'extra_in_rust',
-                'rust': rust_val[key]
+                'path': format_path(path),
+                'type': 'type_mismatch',
+                'java': f"{java_type.__name__}: {java_val}",
+                'rust': f"{type(rust_val).__name__}: {rust_val}"
             })
+            continue
         
-        # Compare common keys
-        for key in java_keys & rust_keys:
-            compare_values(f"{path}.{key}", java_val[key], rust_val[key], differences)
-    
-    elif isinstance(java_val, list):
-        if len(java_val) != len(rust_val):
-            differences.append({
-                'path': path,
-                'type': 'array_length_mismatch',
-                'java_len': len(java_val),
-                'rust_len': len(rust_val)
-            })
+        # Containers are checked with C-level equality first: identical subtrees
+        # (the common case once translators agree) are skipped without a Python
+        # walk. Equality treats True == 1 == 1.0, so a match is confirmed by
+        # comparing the subtrees' canonical JSON, which keeps those distinct
+        # but, like equality, ignores key order. A subtree too deep to encode
+        # falls through to the walk below.
+        if java_type is dict or java_type is list:
+            try:
+                if java_val == rust_val and canonical_json(java_val) == canonical_json(rust_val):
+                    continue
+            except (RecursionError, ValueError, TypeError):
+                pass
+        
+        if java_type is dict:
+            # One pass over each side's keys classifies them, with a single
+            # lookup per key and no intermediate key sets. `shared` counts
+            # keys present on both sides, ignored ones included.
+            children = []
+            shared = 0
+            for key, java_child in java_val.items():
+                if key in IGNORED_KEYS:
+                    if key in rust_val:
+                        shared += 1
+                    continue
+                rust_child = rust_val.get(key, _MISSING)
+                if rust_child is not _MISSING:
+                    shared += 1
+                    children.append(((path, key), java_child, rust_child))
+                # Missing in rust, skipping empty arrays
+                elif not (type(java_child) is list and not java_child):
+                    differences.append({
+                        'path': format_path((path, key)),
+                        'type': 'missing_in_rust',
+                        'java': java_child
+                    })
+            
+            # Extra in rust, skipping empty arrays. When every rust key was
+            # already seen above there are none, so the scan is skipped.
+            if shared != len(rust_val):
+                for key, rust_child in rust_val.items():
+                    if key in java_val or key in IGNORED_KEYS:
+                        continue
+                    if type(rust_child) is list and not rust_child:
+                        continue
+                    differences.append({
+                        'path': format_path((path, key)),
+                        'type': 'extra_in_rust',
+                        'rust': rust_child
+                    })
+            
+            # Compare common keys
+            stack.extend(reversed(children))
+        
+        elif java_type is list:
+            if len(java_val) != len(rust_val):
+                differences.append({
+                    'path': format_path(path),
+                    'type': 'array_length_mismatch',
+                    'java_len': len(java_val),
+                    'rust_len': len(rust_val)
+                })
             # Compare up to the shorter length
-            for i in range(min(len(java_val), len(rust_val))):
-                compare_values(f"{path}[{i}]", java_val[i], rust_val[i], differences)
-        else:
-            for i, (j, r) in enumerate(zip(java_val, rust_val)):
-                compare_values(f"{path}[{i}]", j, r, differences)
-    
-    else:
-        if java_val != rust_val:
+            for i in reversed(range(min(len(java_val), len(rust_val)))):
+                stack.append(((path, i), java_val[i], rust_val[i]))
+        
+        elif java_val != rust_val:
             differences.append({
-                'path': path,
+                'path': format_path(path),
                 'type': 'value_mismatch',
                 'java': java_val,
                 'rust': rust_val
             })
 
 
-def run_java_translator(cql_file: Path, output_dir: Path, options: list[str] = None) -> Path:
-    """Run the Java CQL-to-ELM translator."""
+class JavaSession:
+    """Long-running JVMs that run the Java CLI in-process, shared by a batch run.
+    
+    Translations after a JVM's first skip JVM startup and run on JIT-compiled
+    translator code. Each JVM serves one request at a time, so a caller checks
+    out an idle one (starting a new one when none is free) and returns it
+    after its request. See TranslatorServer.java for the wire protocol.
+    """
+    
+    def __init__(self):
+        self.idle = queue.SimpleQueue()
+        self.processes: list[subprocess.Popen] = []
+        self.error_logs = {}
+        self.failed = False
+        self.lock = threading.Lock()
+    
+    def command(self) -> list[str]:
+        java_home = os.environ.get("JAVA_HOME")
+        java = str(Path(java_home) / "bin/java") if java_home else "java"
+        install_dir = JAVA_CLI.parent.parent
+        return [java, "-cp", str(install_dir / "lib/*"), str(JAVA_SERVER), java_cli_main_class()]
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def run(self, args: list[str]) -> Optional[tuple[int, str]]:
+        """Run the CLI with `args`, or return None if the session is unusable.
+        
+        The first failure disables the session for every worker and is
+        reported once, with whatever the JVM wrote to stderr (for example
+        the compiler errors when TranslatorServer.java does not build).
+        """
+        if self.failed:
+            return None
+        try:
+            process = self.idle.get_nowait()
+            fresh = False
+        except queue.Empty:
+            # The server only writes to stderr outside of requests, on startup
+            # or fatal errors, so a file holds it without risk of blocking
+            error_log = tempfile.TemporaryFile()
+            try:
+                process = subprocess.Popen(self.command(), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=error_log)
+            except OSError as e:
+                error_log.close()
+                self.fail(f"could not start Java: {e}")
+                return None
+            self.processes.append(process)
+            self.error_logs[process] = error_log
+            fresh = True
+        try:
+            process.stdin.write(("\t".join(args) + "\n").encode())
+            process.stdin.flush()
+            status, length = process.stdout.readline().split()
+            output = process.stdout.read(int(length))
+        except (OSError, ValueError):
+            self.fail("the JVM failed to start" if fresh else "the JVM exited", process)
+            return None
+        self.idle.put(process)
+        return (0 if status == b"OK" else 1), output.decode(errors='replace')
+    
+    def fail(self, cause: str, process: subprocess.Popen = None):
+        """Disable the session, warning once across all workers."""
+        with self.lock:
+            if self.failed:
+                return
+            self.failed = True
+        message = f"Java translator daemon unavailable ({cause}), falling back to one-shot CLI runs"
+        if process is not None:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                pass
+            error_log = self.error_logs[process]
+            error_log.seek(0)
+            errors = error_log.read().decode(errors='replace').strip()
+            if errors:
+                message += f":\n{errors}"
+        emit(message, file=sys.stderr)
+    
+    def close(self):
+        for process in self.processes:
+            try:
+                process.stdin.close()
+                process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                process.kill()
+            process.stdout.close()
+            self.error_logs[process].close()
+
+
+@functools.lru_cache(maxsize=None)
+def java_cli_main_class() -> str:
+    """Read the CLI's main class from its Gradle start script."""
+    script = JAVA_CLI.read_text()
+    match = re.search(r'-classpath "\$CLASSPATH" \\\s+([\w.$]+)', script)
+    return match.group(1) if match else "org.cqframework.cql.cql2elm.cli.Main"
+
+
+def run_java_cli(args: list[str], session: JavaSession = None) -> tuple[int, str]:
+    """Run the Java CLI, returning its exit status and diagnostic output.
+    
+    Uses `session` when given and falls back to a one-shot CLI process
+    otherwise, including once the session has failed (for example because
+    the CLI called System.exit).
+    """
+    if session and USE_JAVA_DAEMON:
+        result = session.run(args)
+        if result is not None:
+            return result
+    
+    result = subprocess.run([str(JAVA_CLI), *args], capture_output=True, text=True)
+    return result.returncode, result.stderr
+
+
+def run_java_translator(cql_file: Path, output_dir: Path, options: list[str] = None, session: JavaSession = None) -> Path:
+    """Run the Java CQL-to-ELM translator, through `session` when given."""
     output_file = output_dir / f"{cql_file.stem}-java.json"
     
-    cmd = [
-        str(JAVA_CLI),
+    key = java_cache_key(cql_file, options)
+    if cache_fetch("java", key, output_file):
+        return output_file
+    
+    args = [
         "--input", str(cql_file),
         "--format", "JSON",
         "--output", str(output_dir)
     ]
     
     if options:
-        cmd.extend(options)
+        args.extend(options)
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    returncode, stderr = run_java_cli(args, session)
     
     # Java CLI outputs to <stem>.json, rename to -java.json
     java_output = output_dir / f"{cql_file.stem}.json"
     if java_output.exists():
         java_output.rename(output_file)
     
-    if result.returncode != 0:
-        print(f"Java translator error: {result.stderr}", file=sys.stderr)
+    if returncode != 0:
+        emit(f"Java translator error: {stderr}", file=sys.stderr)
         return None
     
     # Check that output file exists
     if not output_file.exists():
-        print(f"Java translator produced no output", file=sys.stderr)
+        emit("Java translator produced no output", file=sys.stderr)
         return None
     
+    cache_store("java", key, output_file)
     return output_file
 
 
-def run_rust_translator(cql_file: Path, output_dir: Path, options: list[str] = None) -> Path:
-    """Run the Rust CQL-to-ELM translator."""
-    output_file = output_dir / f"{cql_file.stem}-rust.json"
+def run_java_translator_batch(cql_files: list[Path], scratch_dir: Path, options: list[str] = None) -> Optional[dict]:
+    """Run the Java CQL-to-ELM translator once over many CQL files.
     
-    cmd = [str(RUST_CLI), "cql", "compile", str(cql_file)]
+    The CLI translates every .cql file in a directory input, so the files are
+    symlinked into `scratch_dir` and translated by a single JVM. Alongside the
+    requested files, the libraries they include are linked so includes
+    resolve as they do for a per-file run; unrelated siblings are left out, so
+    one that fails to translate cannot fail the batch. Returns a mapping from
+    each requested CQL file to the `<stem>.json` it produced, or None when the
+    batch failed and files should be translated one at a time.
+    """
+    sources = {}
+    for source in include_closure(cql_files):
+        target = source.resolve()
+        # Same-named libraries from different directories cannot share one
+        # input directory
+        if sources.setdefault(source.name, target) != target:
+            return None
+
+    input_dir = scratch_dir / "input"
+    output_dir = scratch_dir / "output"
+    input_dir.mkdir()
+    output_dir.mkdir()
+    for name, target in sources.items():
+        (input_dir / name).symlink_to(target)
+    
+    cmd = [
+        str(JAVA_CLI),
+        "--input", str(input_dir),
+        "--format", "JSON",
+        "--output", str(output_dir)
+    ]
     
     if options:
         cmd.extend(options)
@@ -189,43 +674,150 @@ def run_rust_translator(cql_file: Path, output_dir: Path, options: list[str] = N
     result = subprocess.run(cmd, capture_output=True, text=True)
     
     if result.returncode != 0:
-        print(f"Rust translator error: {result.stderr}", file=sys.stderr)
+        emit(f"Java batch translation failed, translating files individually: {result.stderr}", file=sys.stderr)
         return None
     
-    with open(output_file, 'w') as f:
-        f.write(result.stdout)
+    outputs = {}
+    for cql_file in cql_files:
+        java_output = output_dir / f"{cql_file.stem}.json"
+        if java_output.exists():
+            cache_store("java", java_cache_key(cql_file, options), java_output)
+            outputs[cql_file] = java_output
+    return outputs
+
+
+class RustSession:
+    """Long-running `rh cql compile-many` processes shared by a batch run.
+    
+    Each process compiles one file at a time, so a caller checks out an idle
+    process (starting a new one when none is free) and returns it after its
+    request. Concurrent workers therefore never start more processes than
+    there are threads.
+    """
+    
+    def __init__(self, options: list[str] = None):
+        self.cmd = [str(RUST_CLI), "cql", "compile-many", "--paths-from", "-", *(options or [])]
+        self.idle = queue.SimpleQueue()
+        self.processes: list[subprocess.Popen] = []
+        self.failed = False
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def translate(self, cql_file: Path) -> Optional[tuple[bool, bytes]]:
+        """Compile `cql_file`, returning whether it succeeded and the ELM JSON
+        or error text, or None if the session is unusable (for example because
+        the Rust CLI predates `compile-many`)."""
+        if self.failed:
+            return None
+        try:
+            process = self.idle.get_nowait()
+        except queue.Empty:
+            try:
+                process = subprocess.Popen(self.cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            except OSError:
+                self.failed = True
+                return None
+            self.processes.append(process)
+        try:
+            process.stdin.write(str(cql_file).encode() + b"\n")
+            process.stdin.flush()
+            status, length = process.stdout.readline().split()
+            payload = process.stdout.read(int(length))
+        except (OSError, ValueError):
+            self.failed = True
+            return None
+        self.idle.put(process)
+        return status == b"OK", payload
+    
+    def close(self):
+        for process in self.processes:
+            try:
+                process.stdin.close()
+                process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                process.kill()
+            process.stdout.close()
+
+
+def run_rust_translator(cql_file: Path, output_dir: Path, options: list[str] = None, session: RustSession = None) -> Path:
+    """Run the Rust CQL-to-ELM translator.
+    
+    Uses `session` when given, falling back to a one-shot CLI run if the
+    session cannot serve the request.
+    """
+    output_file = output_dir / f"{cql_file.stem}-rust.json"
+    
+    key = rust_cache_key(cql_file, options)
+    if cache_fetch("rust", key, output_file):
+        return output_file
+    
+    result = session.translate(cql_file) if session else None
+    if result is not None:
+        ok, payload = result
+        if not ok:
+            emit(f"Rust translator error: {payload.decode(errors='replace')}", file=sys.stderr)
+            return None
+        output_file.write_bytes(payload)
+        cache_store("rust", key, output_file)
+        return output_file
+    
+    cmd = [str(RUST_CLI), "cql", "compile", str(cql_file)]
     
+    if options:
+        cmd.extend(options)
+    
+    # Stream ELM straight to disk rather than buffering it in Python
+    with open(output_file, 'wb') as out:
+        result = subprocess.run(cmd, stdout=out, stderr=subprocess.PIPE)
+    
+    if result.returncode != 0:
+        output_file.unlink()
+        emit(f"Rust translator error: {result.stderr.decode(errors='replace')}", file=sys.stderr)
+        return None
+    
+    cache_store("rust", key, output_file)
     return output_file
 
 
 def compare_outputs(java_file: Path, rust_file: Path) -> dict:
     """Compare Java and Rust translator outputs."""
-    with open(java_file) as f:
-        java_elm = json.load(f)
-    
-    with open(rust_file) as f:
-        rust_elm = json.load(f)
+    java_elm = load_json(java_file)
+    rust_elm = load_json(rust_file)
     
-    # Normalize for comparison
-    java_norm = normalize_elm(java_elm)
-    rust_norm = normalize_elm(rust_elm)
-    
-    differences = []
-    compare_values('library', java_norm.get('library', {}), rust_norm.get('library', {}), differences)
+    differences = DifferenceList(MAX_DIFFERENCES)
+    try:
+        compare_values('library', java_elm.get('library', {}), rust_elm.get('library', {}), differences)
+        truncated = False
+    except DiffLimitReached:
+        truncated = True
     
     return {
         'total_differences': len(differences),
-        'differences': differences,
+        'truncated': truncated,
+        'differences': list(differences),
         'java_file': str(java_file),
         'rust_file': str(rust_file),
         'reference_metadata': reference_metadata()
     }
 
 
+def count_differences(result: dict) -> str:
+    """Format a difference count, marking counts cut short by --max-diffs."""
+    suffix = "+" if result.get('truncated') else ""
+    return f"{result['total_differences']}{suffix}"
+
+
 def summarize_differences(comparison: dict) -> str:
     """Generate a human-readable summary of differences."""
     lines = []
-    lines.append(f"Total differences: {comparison['total_differences']}")
+    if comparison.get('truncated'):
+        lines.append(f"Total differences: {count_differences(comparison)} (comparison stopped at --max-diffs limit)")
+    else:
+        lines.append(f"Total differences: {count_differences(comparison)}")
     metadata = comparison.get("reference_metadata", {})
     java_meta = metadata.get("java_translator", {})
     if java_meta.get("commit"):
@@ -259,34 +851,36 @@ def summarize_differences(comparison: dict) -> str:
     return "\n".join(lines)
 
 
-def run_cooking_session(session: str, java_options: list[str] = None, rust_options: list[str] = None, model_filter: str = None) -> list:
+def uses_model(cql_file: Path, model_filter: str) -> bool:
+    """Check a CQL file's data model without decoding it."""
+    content = cql_file.read_bytes()
+    if model_filter == 'none':
+        return USING_PATTERN.search(content) is None
+    return MODEL_PATTERNS[model_filter].search(content) is not None
+
+
+def run_cooking_session(session: str, java_options: list[str] = None, rust_options: list[str] = None, model_filter: str = None, jobs: int = 1, writer: ResultsWriter = None) -> list:
     """Run all CQL files in a Cooking with CQL session."""
     session_dir = COOKING_DIR / session
     if not session_dir.exists():
         print(f"Error: Session directory not found: {session_dir}", file=sys.stderr)
         return []
     
+    cql_files = list_cql_files(session_dir)
+    # Filter by model if specified
+    if model_filter:
+        cql_files = [f for f in cql_files if uses_model(f, model_filter)]
+    
+    comparisons = run_test_cases(cql_files, java_options, rust_options, session_prefix=f"cooking-{session}", jobs=jobs, writer=writer)
+    
     results = []
-    for cql_file in sorted(session_dir.glob("*.cql")):
-        # Filter by model if specified
-        if model_filter:
-            content = cql_file.read_text()
-            if model_filter == 'fhir':
-                if 'using FHIR' not in content:
-                    continue
-            elif model_filter == 'none':
-                if 'using ' in content:
-                    continue
-            elif model_filter == 'qdm':
-                if 'using QDM' not in content:
-                    continue
-        
-        result = run_test_case(cql_file, java_options, rust_options, session_prefix=f"cooking-{session}")
+    for cql_file, result in zip(cql_files, comparisons):
         if result:
             results.append({
                 'session': session,
                 'file': cql_file.name,
                 'total_differences': result['total_differences'],
+                'truncated': result['truncated'],
                 'status': 'compared'
             })
         else:
@@ -294,12 +888,13 @@ def run_cooking_session(session: str, java_options: list[str] = None, rust_optio
                 'session': session,
                 'file': cql_file.name,
                 'total_differences': -1,
+                'truncated': False,
                 'status': 'failed'
             })
     return results
 
 
-def run_operator_tests(test_names: list[str] = None, java_options: list[str] = None, rust_options: list[str] = None) -> list:
+def run_operator_tests(test_names: list[str] = None, java_options: list[str] = None, rust_options: list[str] = None, jobs: int = 1, writer: ResultsWriter = None) -> list:
     """Run the Java cql-to-elm OperatorTests."""
     operator_tests_dir = CQL_TO_ELM_TESTS_DIR / "OperatorTests"
     if not operator_tests_dir.exists():
@@ -320,16 +915,21 @@ def run_operator_tests(test_names: list[str] = None, java_options: list[str] = N
                 # Try case-insensitive glob
                 matches = list(operator_tests_dir.glob(f"*{name}*.cql"))
                 cql_files.extend(matches)
+        # Overlapping names can select a file twice; concurrent runs of the
+        # same file would race on its results directory
+        cql_files = list(dict.fromkeys(cql_files))
     else:
-        cql_files = sorted(operator_tests_dir.glob("*.cql"))
+        cql_files = list_cql_files(operator_tests_dir)
     
-    for cql_file in cql_files:
-        result = run_test_case(cql_file, java_options, rust_options, session_prefix="operator-tests")
+    comparisons = run_test_cases(cql_files, java_options, rust_options, session_prefix="operator-tests", jobs=jobs, writer=writer)
+    
+    for cql_file, result in zip(cql_files, comparisons):
         if result:
             results.append({
                 'test': cql_file.stem,
                 'file': cql_file.name,
                 'total_differences': result['total_differences'],
+                'truncated': result['truncated'],
                 'status': 'compared'
             })
         else:
@@ -337,17 +937,85 @@ def run_operator_tests(test_names: list[str] = None, java_options: list[str] = N
                 'test': cql_file.stem,
                 'file': cql_file.name,
                 'total_differences': -1,
+                'truncated': False,
                 'status': 'failed'
             })
     
     return results
 
 
-def run_test_case(cql_file: Path, java_options: list[str] = None, rust_options: list[str] = None, session_prefix: str = None):
-    """Run both translators on a CQL file and compare outputs."""
-    print(f"\n{'='*60}")
-    print(f"Test case: {cql_file.name}")
-    print(f"{'='*60}")
+def run_test_cases(cql_files: list[Path], java_options: list[str] = None, rust_options: list[str] = None, session_prefix: str = None, jobs: int = 1, writer: ResultsWriter = None) -> list:
+    """Run test cases on a thread pool, returning comparisons in input order.
+    
+    The Java translator runs once up front over all files without a cached
+    translation, to avoid paying JVM startup per file; files missing from the
+    batch output are translated individually, through a shared `JavaSession`
+    when there are several. Each test case then mostly waits on the Rust
+    subprocess, so threads are enough to keep several of them running at
+    once; Rust translations go through a shared `RustSession` so each worker
+    reuses one process. Both sessions are closed when the run finishes.
+    Files must have distinct stems since results directories are keyed by
+    stem.
+    """
+    # Scratch space lives under RESULTS_DIR so batch outputs can be renamed
+    # into per-test results directories without crossing filesystems
+    with tempfile.TemporaryDirectory(prefix="java-batch-", dir=RESULTS_DIR) as scratch, RustSession(rust_options) as rust_session, JavaSession() as jvms:
+        java_outputs = {}
+        uncached = cql_files
+        if USE_CACHE:
+            uncached = [f for f in cql_files if not (CACHE_DIR / "java" / f"{java_cache_key(f, java_options)}.json").exists()]
+        if len(uncached) > 1 and len({f.name for f in uncached}) == len(uncached):
+            emit(f"Running Java translator on {len(uncached)} files...")
+            java_outputs = run_java_translator_batch(uncached, Path(scratch), java_options) or {}
+        
+        # Starting a JVM session only pays off over several individual Java
+        # translations
+        individual = sum(cql_file not in java_outputs for cql_file in uncached)
+        java_session = jvms if individual > 1 else None
+        
+        def run(cql_file: Path):
+            return run_test_case(cql_file, java_options, rust_options, session_prefix, java_batch_output=java_outputs.get(cql_file), writer=writer, rust_session=rust_session, java_session=java_session)
+        
+        # Write whatever finished, even if a test case raised or the run was
+        # interrupted
+        try:
+            if jobs <= 1 or len(cql_files) <= 1:
+                return [run(cql_file) for cql_file in cql_files]
+            
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                return list(executor.map(run, cql_files))
+        finally:
+            if writer:
+                writer.flush()
+
+
+def run_test_case(cql_file: Path, java_options: list[str] = None, rust_options: list[str] = None, session_prefix: str = None, java_batch_output: Path = None, writer: ResultsWriter = None, rust_session: RustSession = None, java_session: JavaSession = None):
+    """Run both translators on a CQL file and compare outputs.
+    
+    If `java_batch_output` is given it is taken as the Java translation of
+    `cql_file` from a batch run, and the Java translator is not invoked.
+    `rust_session` and `java_session` are used for the translations when given.
+    Comparison results are queued on `writer`, which run_test_cases flushes
+    once the batch finishes; without one they are written immediately.
+    """
+    # Buffer the log so concurrent test cases print as whole blocks
+    out = io.StringIO()
+    try:
+        if writer:
+            return _run_test_case(cql_file, java_options, rust_options, session_prefix, java_batch_output, rust_session, java_session, writer, out)
+        writer = ResultsWriter()
+        try:
+            return _run_test_case(cql_file, java_options, rust_options, session_prefix, java_batch_output, rust_session, java_session, writer, out)
+        finally:
+            writer.flush()
+    finally:
+        emit(out.getvalue().rstrip("\n"))
+
+
+def _run_test_case(cql_file: Path, java_options: list[str], rust_options: list[str], session_prefix: str, java_batch_output: Optional[Path], rust_session: Optional[RustSession], java_session: Optional[JavaSession], writer: ResultsWriter, out: io.StringIO):
+    print(f"\n{'='*60}", file=out)
+    print(f"Test case: {cql_file.name}", file=out)
+    print(f"{'='*60}", file=out)
     
     # Create results directory
     if session_prefix:
@@ -357,38 +1025,48 @@ def run_test_case(cql_file: Path, java_options: list[str] = None, rust_options:
     results_dir.mkdir(parents=True, exist_ok=True)
     
     # Run translators
-    print("Running Java translator...")
-    java_output = run_java_translator(cql_file, results_dir, java_options)
-    
-    print("Running Rust translator...")
-    rust_output = run_rust_translator(cql_file, results_dir, rust_options)
+    if java_batch_output:
+        print("Using batched Java translation...", file=out)
+        java_output = java_batch_output.replace(results_dir / f"{cql_file.stem}-java.json")
+        print("Running Rust translator...", file=out)
+        rust_output = run_rust_translator(cql_file, results_dir, rust_options, rust_session)
+    else:
+        # The translators are independent, so run Rust on a helper thread
+        # alongside Java. Both sessions are shared across threads, so which one
+        # is offloaded does not matter; overlapping them needs only one extra
+        # thread, and Java, usually the slower of the two, keeps this one.
+        print("Running Java and Rust translators...", file=out)
+        with ThreadPoolExecutor(max_workers=1) as rust_executor:
+            rust_future = rust_executor.submit(run_rust_translator, cql_file, results_dir, rust_options, rust_session)
+            java_output = run_java_translator(cql_file, results_dir, java_options, java_session)
+        rust_output = rust_future.result()
     
     if not java_output or not rust_output:
-        print("❌ Translation failed")
+        print("❌ Translation failed", file=out)
         return None
     
     # Compare outputs
-    print("Comparing outputs...")
+    print("Comparing outputs...", file=out)
     comparison = compare_outputs(java_output, rust_output)
     
     # Save comparison result
-    comparison_file = results_dir / "comparison.json"
-    with open(comparison_file, 'w') as f:
-        json.dump(comparison, f, indent=2)
+    relative_dir = results_dir.relative_to(RESULTS_DIR)
+    writer.add(f"{relative_dir}/comparison.json", encode_json(comparison))
     
     # Print summary
     summary = summarize_differences(comparison)
-    print(summary)
+    print(summary, file=out)
     
     # Save summary
-    summary_file = results_dir / "summary.txt"
-    with open(summary_file, 'w') as f:
-        f.write(summary)
+    if writer.text_summaries:
+        writer.add(f"{relative_dir}/summary.txt", summary.encode())
     
     return comparison
 
 
 def main():
+    global USE_ORJSON, USE_CACHE, USE_JAVA_DAEMON, MAX_DIFFERENCES
+    
     parser = argparse.ArgumentParser(description='Compare CQL-to-ELM translators')
     parser.add_argument('--test-case', '-t', help='Name of test case to run')
     parser.add_argument('--cql-file', '-f', help='Path to CQL file to test')
@@ -403,11 +1081,34 @@ def main():
                         help='Filter Cooking with CQL by model type (fhir, qdm, or none)')
     parser.add_argument('--summary-only', '-s', action='store_true', 
                         help='Only print summary at end (for batch runs)')
+    parser.add_argument('--jobs', '-J', type=int, default=DEFAULT_JOBS, metavar='N',
+                        help=f'Number of test cases to run concurrently (default: {DEFAULT_JOBS})')
+    parser.add_argument('--pure-python', action='store_true',
+                        help='Use the stdlib json module even if orjson is installed')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Rerun both translators instead of reusing cached outputs')
+    parser.add_argument('--no-java-daemon', action='store_true',
+                        help='Start a fresh Java CLI process for every translation')
+    parser.add_argument('--results-archive', type=Path, metavar='TAR',
+                        help='Write per-test comparison.json and summary.txt files into one tar archive')
+    parser.add_argument('--max-diffs', type=int, default=MAX_DIFFERENCES, metavar='N',
+                        help=f'Stop comparing a file after N differences, 0 for no limit (default: {MAX_DIFFERENCES})')
     args = parser.parse_args()
     
+    MAX_DIFFERENCES = args.max_diffs
+    if args.no_java_daemon:
+        USE_JAVA_DAEMON = False
+    if args.pure_python:
+        USE_ORJSON = False
+    if args.no_cache:
+        USE_CACHE = False
+    
     # Ensure directories exist
     RESULTS_DIR.mkdir(parents=True, exist_ok=True)
     
+    # Batch modes queue per-test results and write them once at the end
+    writer = ResultsWriter(args.results_archive, text_summaries=not args.summary_only)
+    
     if args.operator_tests is not None:
         # Operator tests mode
         if not CQL_TO_ELM_TESTS_DIR.exists():
@@ -415,7 +1116,7 @@ def main():
             sys.exit(1)
         
         test_names = args.operator_tests if args.operator_tests else None
-        all_results = run_operator_tests(test_names, args.java_options, args.rust_options)
+        all_results = run_operator_tests(test_names, args.java_options, args.rust_options, args.jobs, writer)
         
         failed_files = []
         passed_files = []
@@ -447,22 +1148,21 @@ def main():
         if failed_files and not args.summary_only:
             print(f"\nFiles with differences:")
             for r in failed_files[:20]:
-                print(f"  - {r['file']}: {r['total_differences']} differences")
+                print(f"  - {r['file']}: {count_differences(r)} differences")
             if len(failed_files) > 20:
                 print(f"  ... and {len(failed_files) - 20} more")
         
         # Save summary to file
         summary_file = RESULTS_DIR / "operator-tests-summary.json"
-        with open(summary_file, 'w') as f:
-            json.dump({
-                'total': len(all_results),
-                'translation_failures': len(translation_failures),
-                'passed': len(passed_files),
-                'failed': len(failed_files),
-                'translation_failure_files': translation_failures,
-                'failed_files': failed_files,
-                'passed_files': passed_files
-            }, f, indent=2)
+        dump_json({
+            'total': len(all_results),
+            'translation_failures': len(translation_failures),
+            'passed': len(passed_files),
+            'failed': len(failed_files),
+            'translation_failure_files': translation_failures,
+            'failed_files': failed_files,
+            'passed_files': passed_files
+        }, summary_file)
         print(f"\nSummary saved to: {summary_file}")
     
     elif args.cooking is not None:
@@ -474,7 +1174,7 @@ def main():
         sessions = args.cooking
         if not sessions or 'all' in sessions:
             # Get all sessions
-            sessions = sorted([d.name for d in COOKING_DIR.iterdir() if d.is_dir()])
+            sessions = [d.name for d in list_subdirectories(COOKING_DIR)]
         
         all_results = []
         failed_files = []
@@ -482,7 +1182,7 @@ def main():
         translation_failures = []
         
         for session in sessions:
-            results = run_cooking_session(session, args.java_options, args.rust_options, args.model)
+            results = run_cooking_session(session, args.java_options, args.rust_options, args.model, args.jobs, writer)
             all_results.extend(results)
             for r in results:
                 if r['status'] == 'failed':
@@ -514,23 +1214,22 @@ def main():
         if failed_files and not args.summary_only:
             print(f"\nFiles with differences (first 20):")
             for r in failed_files[:20]:
-                print(f"  - {r['session']}/{r['file']}: {r['total_differences']} differences")
+                print(f"  - {r['session']}/{r['file']}: {count_differences(r)} differences")
             if len(failed_files) > 20:
                 print(f"  ... and {len(failed_files) - 20} more")
         
         # Save summary to file
         summary_file = RESULTS_DIR / "cooking-summary.json"
-        with open(summary_file, 'w') as f:
-            json.dump({
-                'model_filter': args.model,
-                'total': len(all_results),
-                'translation_failures': len(translation_failures),
-                'passed': len(passed_files),
-                'failed': len(failed_files),
-                'translation_failure_files': translation_failures,
-                'failed_files': failed_files,
-                'passed_files': passed_files
-            }, f, indent=2)
+        dump_json({
+            'model_filter': args.model,
+            'total': len(all_results),
+            'translation_failures': len(translation_failures),
+            'passed': len(passed_files),
+            'failed': len(failed_files),
+            'translation_failure_files': translation_failures,
+            'failed_files': failed_files,
+            'passed_files': passed_files
+        }, summary_file)
         print(f"\nSummary saved to: {summary_file}")
     
     elif args.cql_file:
@@ -546,14 +1245,13 @@ def main():
             print(f"Error: Test case directory not found: {test_dir}", file=sys.stderr)
             sys.exit(1)
         
-        for cql_file in test_dir.glob("*.cql"):
-            run_test_case(cql_file, args.java_options, args.rust_options)
+        run_test_cases(list_cql_files(test_dir), args.java_options, args.rust_options, jobs=args.jobs, writer=writer)
     
     elif args.all:
-        for test_dir in sorted(TEST_CASES_DIR.iterdir()):
-            if test_dir.is_dir():
-                for cql_file in test_dir.glob("*.cql"):
-                    run_test_case(cql_file, args.java_options, args.rust_options)
+        # Stems are only unique within a test case directory, and results are
+        # keyed by stem, so directories run one after another
+        for test_dir in list_subdirectories(TEST_CASES_DIR):
+            run_test_cases(list_cql_files(test_dir), args.java_options, args.rust_options, jobs=args.jobs, writer=writer)
     
     else:
         parser.print_help()
@@ -0,0 +1,701 @@
+#!/usr/bin/env python3
+
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import stat
+import sys
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+
+
+SCRIPT = Path(__file__).with_name("compare_translators.py")
+SPEC = importlib.util.spec_from_file_location("compare_translators", SCRIPT)
+MODULE = importlib.util.module_from_spec(SPEC)
+sys.modules[SPEC.name] = MODULE
+SPEC.loader.exec_module(MODULE)
+
+
+def differences(java, rust):
+    found = []
+    MODULE.compare_values("library", java, rust, found)
+    return [(d["path"], d["type"]) for d in found]
+
+
+def reference_differences(java, rust):
+    """The original recursive comparison: strip ignored keys everywhere, then
+    diff with key sets. Its report order follows set iteration, so callers
+    compare the results as multisets."""
+
+    def normalize(value):
+        if isinstance(value, dict):
+            return {
+                key: normalize(child)
+                for key, child in value.items()
+                if key not in MODULE.IGNORED_KEYS
+            }
+        if isinstance(value, list):
+            return [normalize(item) for item in value]
+        return value
+
+    def compare(path, java_val, rust_val, found):
+        if type(java_val) != type(rust_val):
+            found.append((path, "type_mismatch"))
+        elif isinstance(java_val, dict):
+            for key in java_val.keys() - rust_val.keys():
+                if java_val[key] != []:
+                    found.append((f"{path}.{key}", "missing_in_rust"))
+            for key in rust_val.keys() - java_val.keys():
+                if rust_val[key] != []:
+                    found.append((f"{path}.{key}", "extra_in_rust"))
+            for key in java_val.keys() & rust_val.keys():
+                compare(f"{path}.{key}", java_val[key], rust_val[key], found)
+        elif isinstance(java_val, list):
+            if len(java_val) != len(rust_val):
+                found.append((path, "array_length_mismatch"))
+            for i, (java_item, rust_item) in enumerate(zip(java_val, rust_val)):
+                compare(f"{path}[{i}]", java_item, rust_item, found)
+        elif java_val != rust_val:
+            found.append((path, "value_mismatch"))
+
+    found = []
+    compare("library", normalize(java), normalize(rust), found)
+    return found
+
+
+class CompareValuesTests(unittest.TestCase):
+    def test_ignored_keys_are_skipped_at_every_level(self):
+        java = {
+            "translatorVersion": "3.0",
+            "statements": {"def": [{"name": "X", "signatureLevel": "All"}]},
+        }
+        rust = {
+            "translatorVersion": "0.1",
+            "statements": {"def": [{"name": "X", "translatorOptions": "Debug"}]},
+        }
+
+        self.assertEqual(differences(java, rust), [])
+
+    def test_empty_arrays_count_as_absent(self):
+        java = {"annotation": [], "operand": [1]}
+        rust = {"operand": [1], "signature": []}
+
+        self.assertEqual(differences(java, rust), [])
+
+    def test_missing_and_extra_keys_are_reported(self):
+        java = {"a": 1, "b": [1]}
+        rust = {"a": 1, "c": {}}
+
+        self.assertEqual(
+            differences(java, rust),
+            [("library.b", "missing_in_rust"), ("library.c", "extra_in_rust")],
+        )
+
+    def test_list_length_mismatch_still_compares_shared_prefix(self):
+        java = {"operand": [1, 2, 3]}
+        rust = {"operand": [1, 5]}
+
+        self.assertEqual(
+            differences(java, rust),
+            [
+                ("library.operand", "array_length_mismatch"),
+                ("library.operand[1]", "value_mismatch"),
+            ],
+        )
+
+    def test_bool_and_int_are_distinct_regardless_of_siblings(self):
+        self.addCleanup(setattr, MODULE, "USE_ORJSON", MODULE.USE_ORJSON)
+        for use_orjson in {False, MODULE.orjson is not None}:
+            with self.subTest(use_orjson=use_orjson):
+                MODULE.USE_ORJSON = use_orjson
+
+                self.assertEqual(
+                    differences({"a": True}, {"a": 1}),
+                    [("library.a", "type_mismatch")],
+                )
+                self.assertEqual(
+                    differences({"a": True, "b": "x"}, {"a": 1, "b": "y"}),
+                    [("library.a", "type_mismatch"), ("library.b", "value_mismatch")],
+                )
+                self.assertEqual(
+                    differences([[1.0]], [[1]]), [("library[0][0]", "type_mismatch")]
+                )
+
+    def test_key_order_does_not_matter(self):
+        self.assertEqual(differences({"a": 1, "b": [2]}, {"b": [2], "a": 1}), [])
+
+    def test_nested_key_order_difference_is_matched_at_the_root(self):
+        def tree(depth, leaf):
+            if depth == 0:
+                return leaf()
+            return {"type": "Add", "operand": [tree(depth - 1, leaf), tree(depth - 1, leaf)]}
+
+        java = tree(8, lambda: {"type": "Literal", "value": "1"})
+        rust = tree(8, lambda: {"value": "1", "type": "Literal"})
+        encode = MODULE.canonical_json
+        calls = []
+        self.addCleanup(setattr, MODULE, "canonical_json", encode)
+        MODULE.canonical_json = lambda data: calls.append(data) or encode(data)
+
+        self.assertEqual(differences(java, rust), [])
+        # One encoding per side; reordered leaves must not push the
+        # comparison into re-encoding every ancestor
+        self.assertEqual(len(calls), 2)
+
+    def test_reports_node_differences_before_descending(self):
+        java = {"a": {"v": 1}, "b": 2, "c": [{"v": 1}]}
+        rust = {"a": {"v": 2}, "c": [{"v": 3}], "d": 4}
+
+        self.assertEqual(
+            differences(java, rust),
+            [
+                ("library.b", "missing_in_rust"),
+                ("library.d", "extra_in_rust"),
+                ("library.a.v", "value_mismatch"),
+                ("library.c[0].v", "value_mismatch"),
+            ],
+        )
+
+    def test_deeply_nested_trees_do_not_hit_the_recursion_limit(self):
+        java = rust = 1
+        for _ in range(sys.getrecursionlimit() * 2):
+            java, rust = {"operand": [java]}, {"operand": [rust]}
+        rust_leaf = rust
+        while isinstance(rust_leaf["operand"][0], dict):
+            rust_leaf = rust_leaf["operand"][0]
+        rust_leaf["operand"][0] = 2
+
+        found = differences(java, rust)
+
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found[0][1], "value_mismatch")
+
+    def test_matches_reference_comparison_on_random_trees(self):
+        rng = random.Random(20240611)
+        leaves = [1, 2, 1.0, "1", "x", True, False, None, [], {}]
+        keys = ["a", "b", "c", "type", "value", "operand", *sorted(MODULE.IGNORED_KEYS)]
+
+        def generate(depth):
+            roll = rng.random()
+            if depth > 4 or roll < 0.3:
+                return rng.choice(leaves)
+            if roll < 0.6:
+                return [generate(depth + 1) for _ in range(rng.randint(0, 4))]
+            return {rng.choice(keys): generate(depth + 1) for _ in range(rng.randint(0, 6))}
+
+        def mutate(value, depth=0):
+            if rng.random() < 0.15:
+                return generate(depth)
+            if isinstance(value, dict):
+                value = {k: mutate(v, depth + 1) for k, v in value.items() if rng.random() > 0.05}
+                if rng.random() < 0.1:
+                    value[rng.choice(keys)] = generate(depth + 1)
+                return value
+            if isinstance(value, list):
+                value = [mutate(item, depth + 1) for item in value]
+                if rng.random() < 0.1:
+                    value.append(generate(depth + 1))
+                return value
+            return value
+
+        for _ in range(500):
+            java = generate(0)
+            rust = mutate(java)
+            self.assertCountEqual(
+                differences(java, rust),
+                reference_differences(java, rust),
+                msg=json.dumps([java, rust]),
+            )
+
+
+class FormatPathTests(unittest.TestCase):
+    def test_renders_keys_and_indices(self):
+        path = (None, "library")
+        for part in ["statements", "def", 0, "expression", "operand", 12]:
+            path = (path, part)
+
+        self.assertEqual(
+            MODULE.format_path(path), "library.statements.def[0].expression.operand[12]"
+        )
+
+    def test_root_only(self):
+        self.assertEqual(MODULE.format_path((None, "library")), "library")
+
+
+class CompareOutputsTests(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, MODULE, "MAX_DIFFERENCES", MODULE.MAX_DIFFERENCES)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.java_file = Path(tmp.name) / "java.json"
+        self.rust_file = Path(tmp.name) / "rust.json"
+
+    def compare(self, java_values, rust_values):
+        self.java_file.write_text(json.dumps({"library": {"values": java_values}}))
+        self.rust_file.write_text(json.dumps({"library": {"values": rust_values}}))
+        return MODULE.compare_outputs(self.java_file, self.rust_file)
+
+    def test_max_diffs_truncates_and_flags_the_comparison(self):
+        MODULE.MAX_DIFFERENCES = 3
+
+        comparison = self.compare([1, 2, 3, 4, 5], [0, 0, 0, 0, 0])
+
+        self.assertTrue(comparison["truncated"])
+        self.assertEqual(comparison["total_differences"], 3)
+        self.assertEqual(
+            [d["path"] for d in comparison["differences"]],
+            ["library.values[0]", "library.values[1]", "library.values[2]"],
+        )
+        self.assertIn("--max-diffs", MODULE.summarize_differences(comparison))
+
+    def test_exactly_max_diffs_is_not_truncated(self):
+        MODULE.MAX_DIFFERENCES = 3
+
+        comparison = self.compare([1, 2, 3, 4], [0, 0, 0, 4])
+
+        self.assertFalse(comparison["truncated"])
+        self.assertEqual(comparison["total_differences"], 3)
+
+    def test_zero_max_diffs_means_no_limit(self):
+        MODULE.MAX_DIFFERENCES = 0
+
+        comparison = self.compare(list(range(1000)), [-1] * 1000)
+
+        self.assertFalse(comparison["truncated"])
+        self.assertEqual(comparison["total_differences"], 1000)
+
+
+    def test_truncated_counts_are_marked(self):
+        self.assertEqual(
+            MODULE.count_differences({"total_differences": 500, "truncated": True}), "500+"
+        )
+        self.assertEqual(
+            MODULE.count_differences({"total_differences": 3, "truncated": False}), "3"
+        )
+
+
+class RunOperatorTestsTests(unittest.TestCase):
+    def test_results_carry_truncation(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        operator_tests = Path(tmp.name) / "OperatorTests"
+        operator_tests.mkdir()
+        for name in ("Capped", "Failed"):
+            (operator_tests / f"{name}.cql").write_text(f"library {name}\n")
+        comparisons = [{"total_differences": 500, "truncated": True}, None]
+        for name, value in [
+            ("CQL_TO_ELM_TESTS_DIR", Path(tmp.name)),
+            ("run_test_cases", lambda *args, **kwargs: comparisons),
+        ]:
+            self.addCleanup(setattr, MODULE, name, getattr(MODULE, name))
+            setattr(MODULE, name, value)
+
+        results = MODULE.run_operator_tests()
+
+        self.assertEqual(
+            [(r["file"], r["total_differences"], r["truncated"]) for r in results],
+            [("Capped.cql", 500, True), ("Failed.cql", -1, False)],
+        )
+
+
+class ResultsWriterTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.addCleanup(setattr, MODULE, "RESULTS_DIR", MODULE.RESULTS_DIR)
+        MODULE.RESULTS_DIR = self.dir
+        self.archive = self.dir / "archives" / "results.tar"
+
+    def members(self):
+        with tarfile.open(self.archive) as tar:
+            return {member.name: tar.extractfile(member).read() for member in tar}
+
+    def test_archive_is_replaced_then_appended_to(self):
+        self.archive.parent.mkdir()
+        with tarfile.open(self.archive, "w") as tar:
+            tar.addfile(tarfile.TarInfo("stale/summary.txt"), io.BytesIO(b""))
+        writer = MODULE.ResultsWriter(self.archive)
+
+        writer.add("a/comparison.json", b"{}")
+        writer.flush()
+        writer.add("b/comparison.json", b"[1]")
+        writer.add("b/summary.txt", b"ok")
+        writer.flush()
+        writer.flush()
+
+        self.assertEqual(
+            self.members(),
+            {"a/comparison.json": b"{}", "b/comparison.json": b"[1]", "b/summary.txt": b"ok"},
+        )
+
+    def test_files_are_written_under_the_results_directory(self):
+        (self.dir / "a").mkdir()
+        writer = MODULE.ResultsWriter()
+
+        writer.add("a/summary.txt", b"first")
+        writer.add("a/summary.txt", b"second")
+        writer.flush()
+
+        self.assertEqual((self.dir / "a" / "summary.txt").read_bytes(), b"second")
+        self.assertEqual(writer.files, {})
+
+    def test_run_test_cases_flushes_when_a_test_case_raises(self):
+        writer = MODULE.ResultsWriter(self.archive)
+
+        def run_test_case(cql_file, *args, writer, **kwargs):
+            writer.add(f"{cql_file.stem}/summary.txt", b"done")
+            raise RuntimeError("translator crashed")
+
+        for name, value in [("run_test_case", run_test_case), ("USE_CACHE", False)]:
+            self.addCleanup(setattr, MODULE, name, getattr(MODULE, name))
+            setattr(MODULE, name, value)
+
+        with self.assertRaises(RuntimeError):
+            MODULE.run_test_cases([self.dir / "Crashed.cql"], writer=writer)
+
+        self.assertEqual(self.members(), {"Crashed/summary.txt": b"done"})
+
+
+class UsesModelTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def models(self, text):
+        cql_file = self.dir / "Library.cql"
+        cql_file.write_bytes(text.encode())
+        return [model for model in ("fhir", "qdm", "none") if MODULE.uses_model(cql_file, model)]
+
+    def test_matches_the_declared_model(self):
+        self.assertEqual(self.models("library A\nusing FHIR version '4.0.1'\n"), ["fhir"])
+        self.assertEqual(self.models("library A\n  using\tQDM version '5.6'\n"), ["qdm"])
+        self.assertEqual(self.models("library A\ndefine X: 1\n"), ["none"])
+
+    def test_model_names_match_as_whole_words(self):
+        self.assertEqual(self.models("library A\nusing FHIRPlus version '1'\n"), [])
+        self.assertEqual(self.models("library A\nusing QDMLegacy\n"), [])
+
+    def test_none_ignores_using_inside_other_text(self):
+        self.assertEqual(
+            self.models("library A\ndefine \"Musing\": 'stop using it'\n"), ["none"]
+        )
+
+    def test_reads_non_utf8_sources(self):
+        cql_file = self.dir / "Latin1.cql"
+        cql_file.write_bytes("library A\n// caf\u00e9\nusing FHIR\n".encode("latin-1"))
+
+        self.assertTrue(MODULE.uses_model(cql_file, "fhir"))
+
+
+class CacheKeyTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.build = self.dir / "rh"
+        self.build.write_text("build")
+        self.main = self.write("sources/Main.cql", "library Main\ninclude Helper\n")
+        self.helper = self.write("libs/Helper.cql", "library Helper\n")
+        self.packages = self.dir / "packages"
+        self.library = self.write(
+            "packages/fhir.cqf.common#4.0.1/package/Library-FHIRHelpers.json", "{}"
+        )
+
+    def write(self, name, text):
+        path = self.dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+        return path
+
+    def key(self, options=None, packages_dir=None):
+        # Digests are memoized for the length of a run; a test edits sources
+        # between runs
+        MODULE.source_dir_digest.cache_clear()
+        MODULE.packages_fingerprint.cache_clear()
+        return MODULE.cache_key(self.build, self.main, options, packages_dir)
+
+    def test_unchanged_sources_give_the_same_key(self):
+        options = ["--lib-path", str(self.helper.parent)]
+
+        self.assertEqual(self.key(options, self.packages), self.key(options, self.packages))
+
+    def test_sibling_change_invalidates(self):
+        before = self.key()
+        self.write("sources/Other.cql", "library Other\n")
+
+        self.assertNotEqual(self.key(), before)
+
+    def test_lib_path_change_invalidates(self):
+        for options in (["--lib-path", str(self.helper.parent)], [f"--lib-path={self.helper.parent}"]):
+            with self.subTest(options=options):
+                before = self.key(options)
+                self.helper.write_text(self.helper.read_text() + "define X: 1\n")
+
+                self.assertNotEqual(self.key(options), before)
+
+    def test_package_change_invalidates_only_when_packages_are_searched(self):
+        before, without_packages = self.key(packages_dir=self.packages), self.key()
+        self.library.write_text('{"content": []}')
+
+        self.assertNotEqual(self.key(packages_dir=self.packages), before)
+        self.assertEqual(self.key(), without_packages)
+
+
+# Stands in for cql-to-elm-cli: translates every file in --input to
+# <stem>.json in --output, failing without output if any of them is broken
+FAKE_JAVA_CLI = f"""#!{sys.executable}
+import sys
+from pathlib import Path
+args = dict(zip(sys.argv[1::2], sys.argv[2::2]))
+sources = sorted(Path(args["--input"]).glob("*.cql"))
+if any(b"BROKEN" in source.read_bytes() for source in sources):
+    sys.exit("translation failed")
+for source in sources:
+    (Path(args["--output"]) / f"{{source.stem}}.json").write_text("{{}}")
+"""
+
+
+class IncludeClosureTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def write(self, name, text):
+        path = self.dir / name
+        path.write_text(text)
+        return path
+
+    def test_follows_includes_transitively(self):
+        main = self.write("Main.cql", "library Main\ninclude Common.Helper version '1' called H\n")
+        helper = self.write("Helper-1.cql", 'library Helper\n  include "Base"\n')
+        base = self.write("Base.cql", "library Base\ninclude Main\n")
+        self.write("Unrelated.cql", "library Unrelated\n")
+        self.write("HelperTests.cql", "library HelperTests\n")
+
+        self.assertEqual(MODULE.include_closure([main]), [main, helper, base])
+
+    def test_missing_includes_are_left_to_the_translator(self):
+        main = self.write("Main.cql", "library Main\ninclude Absent\n")
+
+        self.assertEqual(MODULE.include_closure([main]), [main])
+
+
+class RunJavaTranslatorBatchTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        cli = self.dir / "bin" / "cql-to-elm-cli"
+        cli.parent.mkdir()
+        cli.write_text(FAKE_JAVA_CLI)
+        cli.chmod(cli.stat().st_mode | stat.S_IXUSR)
+        for name, value in [("JAVA_CLI", cli), ("CACHE_DIR", self.dir / "cache")]:
+            self.addCleanup(setattr, MODULE, name, getattr(MODULE, name))
+            setattr(MODULE, name, value)
+        self.sources = self.dir / "sources"
+        self.sources.mkdir()
+
+    def write(self, name, text):
+        path = self.sources / name
+        path.write_text(text)
+        return path
+
+    def batch(self, cql_files):
+        scratch = self.dir / "scratch"
+        scratch.mkdir()
+        with contextlib.redirect_stderr(io.StringIO()):
+            return MODULE.run_java_translator_batch(cql_files, scratch)
+
+    def test_links_requested_files_and_their_includes_only(self):
+        main = self.write("Main.cql", "library Main\ninclude Helper\n")
+        self.write("Helper.cql", "library Helper\n")
+        self.write("Broken.cql", "library Broken\nBROKEN\n")
+
+        outputs = self.batch([main])
+
+        self.assertEqual(list(outputs), [main])
+        self.assertEqual(
+            sorted(os.listdir(self.dir / "scratch" / "input")), ["Helper.cql", "Main.cql"]
+        )
+
+    def test_broken_requested_file_fails_the_batch(self):
+        main = self.write("Main.cql", "library Main\nBROKEN\n")
+
+        self.assertIsNone(self.batch([main]))
+
+    def test_same_named_libraries_from_different_directories_fail_the_batch(self):
+        first = self.write("Main.cql", "library Main\n")
+        other = self.sources / "other"
+        other.mkdir()
+        second = other / "Main.cql"
+        second.write_text("library Main\n")
+
+        self.assertIsNone(self.batch([first, second]))
+
+
+
+# Stands in for TranslatorServer.java: answers each request with the framing
+# `OK n` / `ERR n` and n bytes of output, and exits on an "exit" request
+FAKE_JAVA_SERVER = """
+import sys
+for line in sys.stdin.buffer:
+    args = line.rstrip(b"\\n").split(b"\\t")
+    if args[0] == b"exit":
+        sys.exit("stopped by System.exit")
+    output = b"ran " + b" ".join(args) + "\u00e9".encode()
+    status = b"ERR" if b"--bad" in args else b"OK"
+    sys.stdout.buffer.write(status + b" %d\\n" % len(output) + output)
+    sys.stdout.buffer.flush()
+"""
+
+
+class JavaSessionTests(unittest.TestCase):
+    def session(self, command):
+        session = MODULE.JavaSession()
+        session.command = lambda: command
+        self.addCleanup(session.close)
+        return session
+
+    def run_quietly(self, session, args):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            result = session.run(args)
+        return result, stderr.getvalue()
+
+    def test_reads_framed_replies_and_reuses_the_process(self):
+        session = self.session([sys.executable, "-c", FAKE_JAVA_SERVER])
+
+        self.assertEqual(session.run(["--input", "a b.cql"]), (0, "ran --input a b.cql\u00e9"))
+        self.assertEqual(session.run(["--bad"]), (1, "ran --bad\u00e9"))
+        self.assertEqual(len(session.processes), 1)
+
+    def test_startup_failure_reports_the_jvm_errors_once(self):
+        session = self.session(
+            [sys.executable, "-c", "import sys; sys.exit('TranslatorServer.java:1: error: compilation failed')"]
+        )
+
+        result, warning = self.run_quietly(session, ["--input", "A.cql"])
+        again, second_warning = self.run_quietly(session, ["--input", "B.cql"])
+
+        self.assertIsNone(result)
+        self.assertIsNone(again)
+        self.assertTrue(session.failed)
+        self.assertIn("the JVM failed to start", warning)
+        self.assertIn("error: compilation failed", warning)
+        self.assertEqual(second_warning, "")
+
+    def test_missing_java_is_reported(self):
+        session = self.session([str(Path(tempfile.gettempdir()) / "no-such-java")])
+
+        result, warning = self.run_quietly(session, ["--input", "A.cql"])
+
+        self.assertIsNone(result)
+        self.assertIn("could not start Java", warning)
+
+    def test_exit_after_serving_requests_is_reported_as_an_exit(self):
+        session = self.session([sys.executable, "-c", FAKE_JAVA_SERVER])
+        self.assertEqual(session.run(["ok"]), (0, "ran ok\u00e9"))
+
+        result, warning = self.run_quietly(session, ["exit"])
+
+        self.assertIsNone(result)
+        self.assertIn("the JVM exited", warning)
+        self.assertIn("stopped by System.exit", warning)
+
+    def test_concurrent_failures_warn_once(self):
+        session = self.session([sys.executable, "-c", "import sys; sys.exit('boom')"])
+        stderr = io.StringIO()
+
+        with contextlib.redirect_stderr(stderr):
+            with MODULE.ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(session.run, [["--input", f"{i}.cql"] for i in range(16)]))
+
+        self.assertEqual(results, [None] * 16)
+        self.assertEqual(stderr.getvalue().count("falling back"), 1)
+
+
+
+# Stands in for `rh cql compile-many --paths-from -`: answers each path with
+# `OK n` / `ERR n` and n bytes of ELM JSON or error text
+FAKE_RUST_CLI = f"""#!{sys.executable}
+import json
+import sys
+from pathlib import Path
+options = sys.argv[5:]
+for line in sys.stdin:
+    source = Path(line.strip()).read_text()
+    if "BROKEN" in source:
+        status, payload = "ERR", "Compilation failed with 1 error(s):\\n  \u2717 BROKEN"
+    else:
+        status, payload = "OK", json.dumps({{"library": source, "options": options}})
+    payload = payload.encode()
+    sys.stdout.buffer.write(status.encode() + b" %d\\n" % len(payload) + payload)
+    sys.stdout.buffer.flush()
+"""
+
+
+class RustSessionTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.addCleanup(setattr, MODULE, "RUST_CLI", MODULE.RUST_CLI)
+        MODULE.RUST_CLI = self.dir / "rh"
+
+    def install_cli(self, text):
+        MODULE.RUST_CLI.write_text(text)
+        MODULE.RUST_CLI.chmod(MODULE.RUST_CLI.stat().st_mode | stat.S_IXUSR)
+
+    def write(self, name, text):
+        path = self.dir / name
+        path.write_text(text)
+        return path
+
+    def session(self, options=None):
+        session = MODULE.RustSession(options)
+        self.addCleanup(session.close)
+        return session
+
+    def test_reads_framed_records_and_reuses_the_process(self):
+        self.install_cli(FAKE_RUST_CLI)
+        session = self.session(["--compact"])
+        good = self.write("Good.cql", "library Caf\u00e9")
+        broken = self.write("Broken.cql", "BROKEN")
+
+        ok, payload = session.translate(good)
+        self.assertTrue(ok)
+        self.assertEqual(json.loads(payload), {"library": "library Caf\u00e9", "options": ["--compact"]})
+        self.assertEqual(
+            session.translate(broken),
+            (False, "Compilation failed with 1 error(s):\n  \u2717 BROKEN".encode()),
+        )
+        self.assertTrue(session.translate(good)[0])
+        self.assertEqual(len(session.processes), 1)
+
+    def test_cli_without_compile_many_disables_the_session(self):
+        self.install_cli(f"#!{sys.executable}\nimport sys\nsys.exit(\"unrecognized subcommand 'compile-many'\")\n")
+        session = self.session()
+        source = self.write("Good.cql", "library Good")
+
+        self.assertIsNone(session.translate(source))
+        self.assertTrue(session.failed)
+        self.assertIsNone(session.translate(source))
+        self.assertEqual(len(session.processes), 1)
+
+    def test_missing_cli_disables_the_session(self):
+        session = self.session()
+
+        self.assertIsNone(session.translate(self.write("Good.cql", "library Good")))
+        self.assertTrue(session.failed)
+
+
+if __name__ == "__main__":
+    unittest.main()